@@ -6,7 +6,8 @@ FriCAS Professional CLI Wrapper (Windows)
 
 Features
 - Persistent REPL session under the hood; robust prompt detection.
-- Subcommands: eval, file, help, summary, what, system, version, repl, pipe.
+- Subcommands: eval, file, help, summary, what, system, version, repl, pipe, server.
+- Optional `server` mode so repeated invocations share one warm FriCAS process.
 - Clean output (optional --raw to keep banner/echoes).
 - Timeouts, exit codes, graceful shutdown.
 - No third-party deps.
@@ -15,17 +16,28 @@ Tested design for FriCAS 1.3.x on Windows with Scoop layout.
 """
 
 import argparse
+import functools
+import getpass
+import json
+import locale
 import os
-import queue
 import re
+import selectors
 import signal
+import stat
 import subprocess
 import sys
 import tempfile
 import threading
 import time
+from multiprocessing.connection import (
+    AuthenticationError,
+    Client,
+    Connection,
+    Listener,
+)
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Generator, Iterator, List, Optional, Sequence, Tuple
 
 # -------------------------
 # Color and Formatting Utils
@@ -68,16 +80,31 @@ class Colors:
     BG_BLUE = "\033[44m"
 
 
-def colorize(text: str, color: str = "", style: str = "") -> str:
-    """Apply color and style to text with automatic reset"""
+# Precomputed style + color prefixes for the fixed format_* helpers
+ERROR_STYLE = Colors.BOLD + Colors.BRIGHT_RED
+PROMPT_STYLE = Colors.BOLD + Colors.BRIGHT_CYAN
+HEADER_STYLE = Colors.BOLD + Colors.BRIGHT_WHITE
+HIGHLIGHT_STYLE = Colors.BOLD + Colors.BRIGHT_YELLOW
+
+
+def _paint(text: str, prefix: str) -> str:
+    """Wrap text in an already-combined ANSI prefix and a reset"""
     if not _should_use_colors():
         return text
-    prefix = style + color
     return f"{prefix}{text}{Colors.RESET}" if prefix else text
 
 
+def colorize(text: str, color: str = "", style: str = "") -> str:
+    """Apply color and style to text with automatic reset"""
+    return _paint(text, style + color)
+
+
+@functools.lru_cache(maxsize=1)
 def _should_use_colors() -> bool:
-    """Determine if we should use colors based on environment"""
+    """
+    Determine if we should use colors based on environment.
+    Cached, so the tty probe and Windows console setup run once per process.
+    """
     # Disable colors if NO_COLOR env var is set
     if os.environ.get("NO_COLOR"):
         return False
@@ -104,47 +131,47 @@ def _should_use_colors() -> bool:
 
 def format_error(message: str) -> str:
     """Format error messages with red color and bold style"""
-    return colorize(f"✗ ERROR: {message}", Colors.BRIGHT_RED, Colors.BOLD)
+    return _paint(f"✗ ERROR: {message}", ERROR_STYLE)
 
 
 def format_warning(message: str) -> str:
     """Format warning messages with yellow color"""
-    return colorize(f"⚠ WARNING: {message}", Colors.BRIGHT_YELLOW)
+    return _paint(f"⚠ WARNING: {message}", Colors.BRIGHT_YELLOW)
 
 
 def format_info(message: str) -> str:
     """Format info messages with blue color"""
-    return colorize(f"ℹ INFO: {message}", Colors.BRIGHT_BLUE)
+    return _paint(f"ℹ INFO: {message}", Colors.BRIGHT_BLUE)
 
 
 def format_success(message: str) -> str:
     """Format success messages with green color"""
-    return colorize(f"✓ {message}", Colors.BRIGHT_GREEN)
+    return _paint(f"✓ {message}", Colors.BRIGHT_GREEN)
 
 
 def format_prompt(text: str) -> str:
     """Format interactive prompts"""
-    return colorize(text, Colors.BRIGHT_CYAN, Colors.BOLD)
+    return _paint(text, PROMPT_STYLE)
 
 
 def format_command(text: str) -> str:
     """Format FriCAS commands"""
-    return colorize(text, Colors.BRIGHT_MAGENTA)
+    return _paint(text, Colors.BRIGHT_MAGENTA)
 
 
 def format_output_header(text: str) -> str:
     """Format output section headers"""
-    return colorize(text, Colors.BRIGHT_WHITE, Colors.BOLD)
+    return _paint(text, HEADER_STYLE)
 
 
 def format_secondary(text: str) -> str:
     """Format secondary/dim text"""
-    return colorize(text, Colors.BRIGHT_BLACK)
+    return _paint(text, Colors.BRIGHT_BLACK)
 
 
 def format_highlight(text: str) -> str:
     """Format highlighted text"""
-    return colorize(text, Colors.BRIGHT_YELLOW, Colors.BOLD)
+    return _paint(text, HIGHLIGHT_STYLE)
 
 
 # -------------------------
@@ -163,34 +190,54 @@ def _default_fricas_path() -> str:
     return str(Path(userprofile) / r"scoop\apps\fricas\1.3.12\bin\FRICASsys.exe")
 
 
-PROMPT_RE = re.compile(rb"\(\d+\)\s*->\s*$")  # bytes regex; prompt usually ends a line
-BANNER_STRIP_PATTERNS = [
-    r"^Checking for foreign routines$",
-    r"^FRICAS=.*$",
-    r"^spad-lib=.*$",
-    r"^foreign routines found$",
-    r"^openServer result.*$",
-    r"^\s*-{3,}\s*$",
-    r"^\s*FriCAS Computer Algebra System\s*$",
-    r"^\s*Version:.*$",
-    r"^\s*Timestamp:.*$",
-    r"^\s*Issue \)copyright.*$",
-    r"^\s*Issue \)summary.*$",
-    r"^\s*Issue \)quit.*$",
-]
-BANNER_RE_LIST = [re.compile(p) for p in BANNER_STRIP_PATTERNS]
-
-
-def _clean_text_block(text: str) -> str:
-    cleaned = []
-    for ln in text.splitlines():
-        if any(rx.match(ln) for rx in BANNER_RE_LIST):
-            continue
+PROMPT_RE = re.compile(rb"\(\d+\)\s*->\s*\Z")  # bytes regex; prompt ends the output
+PROMPT_COUNT_RE = re.compile(rb"\(\d+\)\s*-> *")  # any prompt, for multi-line sends
+PIPE_DIRECT_MAX_BYTES = 64 * 1024  # larger `pipe` input goes through a temp file
+PIPE_POLL_MAX_INTERVAL = 0.016  # Windows: longest sleep between idle pipe peeks
+# Most input bytes FriCAS may have outstanding (written, not yet answered by a
+# prompt). Windows anonymous pipes hold about 4 KiB, so a larger write could
+# block while FriCAS itself blocks on a stdout pipe nobody is draining.
+PIPE_WRITE_WINDOW = 4096
+# Banner/advisory lines, matched against the stripped raw line. Most are
+# literal, so plain set/startswith checks cover them; only the rule lines
+# need a regex. Matching bytes lets us skip decoding lines we drop.
+BANNER_EXACT = frozenset(
+    {
+        b"Checking for foreign routines",
+        b"foreign routines found",
+        b"FriCAS Computer Algebra System",
+    }
+)
+BANNER_PREFIXES = (
+    b"FRICAS=",
+    b"spad-lib=",
+    b"openServer result",
+    b"Version:",
+    b"Timestamp:",
+    b"Issue )copyright",
+    b"Issue )summary",
+    b"Issue )quit",
+)
+BANNER_RULE_RE = re.compile(rb"-{3,}$")
+
+
+def _clean_text_block(raw: bytes, encoding: str = "utf-8", strip: bool = True) -> str:
+    kept = []
+    for ln in raw.splitlines():
+        ln = ln.rstrip()
         # Skip empty lines that are just banner spacing
-        if not ln.strip():
+        if not ln:
             continue
-        cleaned.append(ln.rstrip())
-    return "\n".join(cleaned).strip()
+        s = ln.lstrip()
+        if s in BANNER_EXACT or s.startswith(BANNER_PREFIXES):
+            continue
+        if BANNER_RULE_RE.match(s):
+            continue
+        kept.append(ln)
+    text = b"\n".join(kept).decode(encoding, errors="ignore")
+    # Lines are already right-stripped; strip=False keeps the first line's
+    # indentation, which 2-D output split across several runs relies on
+    return text.strip() if strip else text
 
 
 def _debug(msg: str, enabled: bool):
@@ -204,28 +251,36 @@ def _debug(msg: str, enabled: bool):
 # -------------------------
 
 
-class _StreamReader(threading.Thread):
+if os.name == "nt":
+    import ctypes
+    from ctypes import wintypes
+
+    # Resolved once; the Windows read loop peeks up to ~1000 times a second
+    _PeekNamedPipe = ctypes.windll.kernel32.PeekNamedPipe  # type: ignore[attr-defined]
+    _PeekNamedPipe.argtypes = [
+        wintypes.HANDLE,
+        wintypes.LPVOID,
+        wintypes.DWORD,
+        wintypes.LPDWORD,
+        wintypes.LPDWORD,
+        wintypes.LPDWORD,
+    ]
+    _PeekNamedPipe.restype = wintypes.BOOL
+
+
+def _peek_named_pipe(handle: int) -> int:
     """
-    Asynchronously read bytes from a pipe and push into a Queue.
-    Also keep a rolling buffer to detect REPL prompts reliably.
+    Return the number of bytes waiting in a Windows anonymous pipe,
+    or -1 if the pipe is broken (the writer has gone away).
     """
+    avail = wintypes.DWORD(0)
+    if not _PeekNamedPipe(handle, None, 0, None, ctypes.byref(avail), None):
+        return -1
+    return avail.value
 
-    def __init__(self, stream, out_queue: queue.Queue, stop_event: threading.Event):
-        super().__init__(daemon=True)
-        self.stream = stream
-        self.q = out_queue
-        self.stop_event = stop_event
 
-    def run(self):
-        try:
-            while not self.stop_event.is_set():
-                chunk = self.stream.read(1)
-                if not chunk:
-                    break
-                self.q.put(chunk)
-        except Exception:
-            # On shutdown, pipe may close; that's fine.
-            pass
+class FriCASExitedError(RuntimeError):
+    """FriCAS closed its output (it exited) before the expected prompt."""
 
 
 class FriCASSession:
@@ -234,10 +289,10 @@ class FriCASSession:
         self.debug = debug
         self.encoding = encoding
         self.proc: Optional[subprocess.Popen] = None
-        self._q: Optional[queue.Queue] = None
-        self._reader: Optional[_StreamReader] = None
-        self._stop_event: Optional[threading.Event] = None
-        self._buffer = bytearray()
+        self._stdin_fd: int = -1
+        self._stdout_fd: int = -1
+        self._sel: Optional[selectors.BaseSelector] = None
+        self._pipe_handle: Optional[int] = None
         self.banner_text: str = ""
 
     def start(self, startup_timeout: float = 20.0) -> None:
@@ -255,75 +310,197 @@ class FriCASSession:
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             creationflags=creationflags,
-            bufsize=0,  # unbuffered
+            bufsize=0,  # stdin is written with os.write on its fd
         )
         if not self.proc.stdin or not self.proc.stdout:
             raise RuntimeError("Failed to start FriCAS: stdio not available")
 
-        self._q = queue.Queue()
-        self._stop_event = threading.Event()
-        self._reader = _StreamReader(self.proc.stdout, self._q, self._stop_event)
-        self._reader.start()
+        self._stdin_fd = self.proc.stdin.fileno()
+        self._stdout_fd = self.proc.stdout.fileno()
+        if os.name == "nt":
+            # select() does not work on Windows pipes; peek the OS handle instead
+            import msvcrt
+
+            self._pipe_handle = msvcrt.get_osfhandle(self._stdout_fd)  # type: ignore[attr-defined]
+        else:
+            # Non-blocking so a wakeup can drain everything already buffered
+            os.set_blocking(self._stdout_fd, False)
+            self._sel = selectors.DefaultSelector()
+            self._sel.register(self._stdout_fd, selectors.EVENT_READ)
 
         # Drain banner until first prompt
         _debug("Waiting for initial prompt…", self.debug)
-        ok, banner = self._wait_for_prompt(deadline=time.time() + startup_timeout)
+        ok, banner, _ = self._wait_for_prompt(deadline=time.time() + startup_timeout)
         if not ok:
             raise TimeoutError("FriCAS did not present a prompt in time")
 
-        # Clear banner bytes so the next command returns cleanly
+        # Keep the banner text around for `version`
         try:
             self.banner_text = banner.decode(self.encoding, errors="ignore")
         except Exception:
             self.banner_text = ""
-        finally:
-            self._buffer.clear()
 
-    def _wait_for_prompt(self, deadline: float) -> Tuple[bool, bytes]:
+    def _read_chunk(self, deadline: float, size: int = 65536) -> Optional[bytes]:
         """
-        Pull bytes from queue until we see a FriCAS prompt or deadline passes.
-        Returns (found, collected_bytes)
+        Block until FriCAS output is available or the deadline passes.
+        Returns the bytes read, b"" on EOF, or None on timeout.
+        """
+        if self._sel is not None:
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._sel.select(remaining):
+                    return None
+                try:
+                    data = os.read(self._stdout_fd, size)
+                except BlockingIOError:
+                    continue  # spurious wakeup
+                if len(data) < size:
+                    return data
+                # A full read means more may be waiting; take it all now so
+                # the caller checks for the prompt once per burst
+                parts = [data]
+                while True:
+                    try:
+                        data = os.read(self._stdout_fd, size)
+                    except BlockingIOError:
+                        break
+                    if not data:
+                        break
+                    parts.append(data)
+                return b"".join(parts)
+
+        # Windows: spin on PeekNamedPipe and only read when bytes are waiting,
+        # so os.read never blocks past the deadline. The sleep starts at 1 ms,
+        # so quick replies are picked up promptly, and doubles while FriCAS
+        # stays silent, so long computations are not polled a thousand times
+        # a second.
+        interval = 0.001
+        while True:
+            avail = _peek_named_pipe(self._pipe_handle)  # type: ignore[arg-type]
+            if avail < 0:
+                return b""
+            if avail > 0:
+                return os.read(self._stdout_fd, min(avail, size))
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, PIPE_POLL_MAX_INTERVAL)
+
+    def _iter_until_prompt(
+        self, deadline: float, prompts: int = 1, inputs: Sequence[bytes] = ()
+    ) -> Generator[bytes, None, int]:
+        """
+        Write `inputs` (encoded lines) to FriCAS and yield output chunks as
+        they arrive until the `prompts`-th FriCAS prompt (included in the
+        last chunk) or the deadline passes.
+        Returns the length of that prompt, which ends the output, or -1 if
+        it was not seen in time. Raises FriCASExitedError if FriCAS exits.
+
+        Lines are written only while the unanswered ones fit in
+        PIPE_WRITE_WINDOW, so a write can never block on a full stdin pipe.
+        """
+        tail = bytearray()  # last few bytes only, for prompt detection
+        since_pause = bytearray()  # only used to count multiple prompts
+        seen = 0
+        sent = 0  # inputs written so far
+        pending = 0  # bytes written for inputs FriCAS has not answered yet
+        while True:
+            if sent < len(inputs):
+                start = sent
+                while sent < len(inputs) and (
+                    not pending or pending + len(inputs[sent]) <= PIPE_WRITE_WINDOW
+                ):
+                    pending += len(inputs[sent])
+                    sent += 1
+                if sent > start:
+                    self._write_bytes(b"".join(inputs[start:sent]))
+            chunk = self._read_chunk(deadline)
+            if chunk is None:
+                return -1  # timed out
+            if not chunk:
+                # EOF; waiting out the deadline would only delay the error
+                raise FriCASExitedError("FriCAS exited unexpectedly")
+            yield chunk
+            # Prompt can appear without trailing newline, so test buffer end;
+            # keeping only the last 128 bytes makes the check constant-time.
+            # Append through a memoryview so a large chunk is not copied whole.
+            tail += memoryview(chunk)[-128:]
+            del tail[:-128]
+            if prompts > 1:
+                since_pause += chunk
+            m = PROMPT_RE.search(tail)
+            if m:
+                if prompts == 1:
+                    return len(tail) - m.start()
+                # Output paused at a prompt; count the ones since the last pause
+                answered = len(PROMPT_COUNT_RE.findall(since_pause))
+                pending -= sum(map(len, inputs[seen : seen + answered]))
+                seen += answered
+                since_pause.clear()
+                if seen >= prompts:
+                    return len(tail) - m.start()
+
+    def _wait_for_prompt(
+        self, deadline: float, prompts: int = 1, inputs: Sequence[bytes] = ()
+    ) -> Tuple[bool, bytes, int]:
+        """
+        Write `inputs` and read output until we see the `prompts`-th FriCAS
+        prompt or deadline passes.
+        Returns (found, collected_bytes, prompt_start); the prompt occupies
+        collected_bytes[prompt_start:].
         """
         collected = bytearray()
-        while time.time() < deadline:
+        chunks = self._iter_until_prompt(deadline, prompts, inputs)
+        while True:
             try:
-                b = self._q.get(timeout=0.05)  # type: ignore[union-attr]
-                collected += b
-                self._buffer += b
-                # Prompt can appear without trailing newline, so test buffer end
-                # We check last ~40 bytes for speed
-                tail = bytes(self._buffer[-64:])
-                if PROMPT_RE.search(tail):
-                    return True, bytes(collected)
-            except queue.Empty:
-                continue
-        return False, bytes(collected)
+                collected += next(chunks)
+            except StopIteration as done:
+                found = done.value >= 0
+                start = len(collected) - done.value if found else len(collected)
+                return found, bytes(collected), start
+
+    def _encode_line(self, line: str) -> bytes:
+        return line.encode(self.encoding, errors="ignore") + b"\n"
+
+    def _write_bytes(self, data: bytes) -> None:
+        """Write encoded input straight to the stdin fd."""
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._stdin_fd, view) :]
 
     def _write_line(self, line: str) -> None:
-        assert self.proc and self.proc.stdin
-        data = (line + "\n").encode(self.encoding, errors="ignore")
-        self.proc.stdin.write(data)
-        self.proc.stdin.flush()
+        self._write_bytes(self._encode_line(line))
 
-    def send(self, line: str, timeout: float = 30.0) -> str:
+    def _send_raw(self, lines: List[str], timeout: float) -> Tuple[bytes, int]:
         """
-        Send a single FriCAS line and capture output until the next prompt.
-        Returns decoded text (utf-8 default).
+        Send FriCAS input lines and return the raw bytes up to and including
+        the prompt that follows the last one, plus the offset at which that
+        final prompt starts.
         """
         if not self.proc or self.proc.poll() is not None:
             self.start()
 
-        _debug(f"-> {line}", self.debug)
-        self._write_line(line)
+        if self.debug:
+            for line in lines:
+                _debug(f"-> {line}", True)
         # Collect until prompt
-        ok, block = self._wait_for_prompt(deadline=time.time() + timeout)
+        ok, block, prompt_start = self._wait_for_prompt(
+            deadline=time.time() + timeout,
+            prompts=len(lines),
+            inputs=[self._encode_line(line) for line in lines],
+        )
         if not ok:
-            raise TimeoutError(f"Timed out waiting for prompt after sending: {line}")
+            if len(lines) == 1:
+                sent = f": {lines[0]}"
+            else:
+                sent = f" {len(lines)} lines"
+            raise TimeoutError(f"Timed out waiting for prompt after sending{sent}")
 
         # The returned block includes EVERYTHING since the last prompt.
-        text = block.decode(self.encoding, errors="ignore")
-        _debug(f"<- block size: {len(text)} chars", self.debug)
         if self.debug:
+            _debug(f"<- block size: {len(block)} bytes", True)
+            text = block.decode(self.encoding, errors="ignore")
             sep = colorize("=" * 30, Colors.BRIGHT_BLACK)
             debug_header = colorize("[DEBUG] RAW BLOCK START", Colors.BRIGHT_BLACK)
             debug_footer = colorize("[DEBUG] RAW BLOCK END", Colors.BRIGHT_BLACK)
@@ -331,22 +508,144 @@ class FriCASSession:
                 f"\n{debug_header}\n{sep}\n{text}\n{sep}\n{debug_footer}\n"
             )
             sys.stderr.flush()
-        return text
+        return block, prompt_start
+
+    def send(self, line: str, timeout: float = 30.0) -> str:
+        """
+        Send a single FriCAS line and capture output until the next prompt.
+        Returns decoded text (utf-8 default).
+        """
+        block, _ = self._send_raw([line], timeout)
+        return block.decode(self.encoding, errors="ignore")
+
+    def _send_iter_raw(self, line: str, timeout: float) -> Iterator[bytes]:
+        """
+        Send a single FriCAS line and yield its output as it arrives, in runs
+        of complete lines (without the final newline). The trailing prompt is
+        removed from the last run.
+        """
+        if not self.proc or self.proc.poll() is not None:
+            self.start()
+
+        if self.debug:
+            _debug(f"-> {line}", True)
+        pending = bytearray()
+        chunks = self._iter_until_prompt(
+            deadline=time.time() + timeout, inputs=[self._encode_line(line)]
+        )
+        while True:
+            try:
+                pending += next(chunks)
+            except StopIteration as done:
+                prompt_len = done.value
+                if prompt_len < 0:
+                    raise TimeoutError(
+                        f"Timed out waiting for prompt after sending: {line}"
+                    )
+                break
+            # Hold back the unfinished last line; it may turn out to be the prompt
+            cut = pending.rfind(b"\n")
+            if cut >= 0:
+                yield bytes(pending[:cut])
+                del pending[: cut + 1]
+        rest = bytes(pending[: max(0, len(pending) - prompt_len)]).rstrip()
+        if rest:
+            yield rest
+
+    def send_iter(self, line: str, timeout: float = 30.0) -> Iterator[str]:
+        """
+        Send a single FriCAS line and yield decoded output as it arrives,
+        so long computations show partial results. The prompt is not included.
+        """
+        for run in self._send_iter_raw(line, timeout):
+            yield run.decode(self.encoding, errors="ignore")
+
+    def request_iter(
+        self, line: str, timeout: float = 30.0, raw: bool = False
+    ) -> Iterator[str]:
+        """Streaming counterpart of request(); yields non-empty pieces."""
+        if raw:
+            yield from self.send_iter(line, timeout=timeout)
+            return
+        echo = line.strip().encode(self.encoding, errors="ignore")
+        first = True
+        for run in self._send_iter_raw(line, timeout):
+            # Echoed input cannot be recognised as "the last line" when
+            # streaming, so drop any line that repeats the command verbatim
+            run = b"\n".join(ln for ln in run.splitlines() if ln.strip() != echo)
+            # Runs split wherever a read ended; like request(), strip only the
+            # start of the whole response, not of every run
+            cleaned = _clean_text_block(run, self.encoding, strip=first)
+            if cleaned:
+                first = False
+                yield cleaned
+
+    def send_many(self, lines: List[str], timeout: float = 30.0) -> str:
+        """
+        Send several FriCAS lines without waiting between them and capture
+        output until the prompt that follows the last one. Returns decoded text, including
+        the intermediate prompts.
+        """
+        if not lines:
+            return ""
+        block, _ = self._send_raw(lines, timeout)
+        return block.decode(self.encoding, errors="ignore")
+
+    def _batch_raw(self, lines: List[str], timeout: float) -> List[bytes]:
+        """
+        Send several lines without waiting between them and collect all their
+        prompts in one wait.
+        Returns the raw output of each line, split at the prompt positions.
+        """
+        block, prompt_start = self._send_raw(lines, timeout)
+        return PROMPT_COUNT_RE.split(block[:prompt_start])
+
+    def batch(self, lines: List[str], timeout: float = 30.0) -> List[str]:
+        """
+        Submit several FriCAS lines as one batch (no round trip per line) and
+        return the decoded output of each line.
+        """
+        if not lines:
+            return []
+        return [
+            part.decode(self.encoding, errors="ignore").rstrip()
+            for part in self._batch_raw(lines, timeout)
+        ]
+
+    def request_many(
+        self, lines: List[str], timeout: float = 30.0, raw: bool = False
+    ) -> str:
+        """High-level multi-line request; per-line outputs are concatenated."""
+        if not lines:
+            return ""
+        if raw:
+            block, prompt_start = self._send_raw(lines, timeout)
+            return block[:prompt_start].rstrip().decode(self.encoding, errors="ignore")
+        # strip=False: the first line of a statement's output may be the
+        # exponent line of 2-D output; only the whole result is stripped
+        outputs = [
+            _clean_text_block(part, self.encoding, strip=False)
+            for part in self._batch_raw(lines, timeout)
+        ]
+        return "\n".join(out for out in outputs if out).strip()
 
     def request(self, line: str, timeout: float = 30.0, raw: bool = False) -> str:
         """High-level request with optional cleanup."""
-        text = self.send(line, timeout=timeout)
-        # Remove the trailing prompt itself, if present at the end of the block
-        text = re.sub(r"\(\d+\)\s*->\s*$", "", text, flags=re.MULTILINE).rstrip()
+        block, prompt_start = self._send_raw([line], timeout)
+        # Cut off the trailing prompt where prompt detection found it
+        block = block[:prompt_start].rstrip()
         if raw:
-            return text
+            return block.decode(self.encoding, errors="ignore")
         # Strip banner lines and echoed command lines that are common
-        cleaned = _clean_text_block(text)
-        # Often FriCAS echoes the command; if the very last line equals the input, drop it
-        lines = cleaned.splitlines()
-        if lines and lines[-1].strip() == line.strip():
-            lines = lines[:-1]
-        return "\n".join(lines).strip()
+        cleaned = _clean_text_block(block, self.encoding)
+        # Often FriCAS echoes the command; if the very last line equals the input,
+        # drop it. Only the tail is inspected, no split of the whole block.
+        cmd = line.strip()
+        if cmd and cleaned.endswith(cmd):
+            head = cleaned[: -len(cmd)]
+            if not head[head.rfind("\n") + 1 :].strip():
+                cleaned = head
+        return cleaned.strip()
 
     def stop(self, graceful_timeout: float = 5.0) -> None:
         if not self.proc:
@@ -366,10 +665,10 @@ class FriCASSession:
                     time.sleep(0.05)
         finally:
             try:
-                if self._stop_event:
-                    self._stop_event.set()
-                if self._reader and self._reader.is_alive():
-                    self._reader.join(timeout=1.0)
+                if self._sel is not None:
+                    self._sel.close()
+                    self._sel = None
+                self._pipe_handle = None
             finally:
                 if self.proc and self.proc.poll() is None:
                     # Hard kill as last resort
@@ -385,6 +684,9 @@ class FriCASSession:
 # -------------------------
 
 
+FRICAS_TITLE_RE = re.compile(r"\bFriCAS Computer Algebra System\b")
+
+
 def op_version(session: FriCASSession, timeout: float, raw: bool) -> str:
     """
     Report FriCAS version from the startup banner captured on session start.
@@ -395,38 +697,32 @@ def op_version(session: FriCASSession, timeout: float, raw: bool) -> str:
         result = session.request(")summary", timeout=timeout, raw=raw)
         return _format_version_output(result, raw)
 
-    lines = [ln.strip() for ln in bt.splitlines() if ln.strip()]
-    # Filter out advisory lines like "Issue )quit …"
-    lines = [ln for ln in lines if not ln.startswith("Issue )")]
-
-    # Find the title region and pick the core lines
-    title_idx = None
-    for i, ln in enumerate(lines):
-        if re.search(r"\bFriCAS Computer Algebra System\b", ln):
-            title_idx = i
-            break
-
-    if title_idx is not None:
-        pick = []
-        for ln in lines[title_idx : title_idx + 6]:
-            if (
-                ("FriCAS Computer Algebra System" in ln)
-                or ln.startswith("Version:")
-                or ln.startswith("Timestamp:")
-            ):
+    # One pass: core lines (title, Version, Timestamp) within the six lines
+    # starting at the title, and the first three core lines anywhere as a
+    # fallback
+    pick: List[str] = []
+    wanted: List[str] = []
+    window = -1  # lines left in the title window; -1 until the title is seen
+    for ln in bt.splitlines():
+        ln = ln.strip()
+        # Skip blanks and advisory lines like "Issue )quit …"
+        if not ln or ln.startswith("Issue )"):
+            continue
+        if window < 0 and FRICAS_TITLE_RE.search(ln):
+            window = 6
+        core = "FriCAS Computer Algebra System" in ln or ln.startswith(
+            ("Version:", "Timestamp:")
+        )
+        if window > 0:
+            window -= 1
+            if core:
                 pick.append(ln)
-        if pick:
-            return _format_version_output("\n".join(pick), raw)
-
-    # Fallback: pick the first three core lines wherever they appear
-    wanted = [
-        ln
-        for ln in lines
-        if ("FriCAS Computer Algebra System" in ln)
-        or ln.startswith("Version:")
-        or ln.startswith("Timestamp:")
-    ]
-    return _format_version_output("\n".join(wanted[:3]), raw)
+            if window == 0:
+                break
+        if core and len(wanted) < 3:
+            wanted.append(ln)
+
+    return _format_version_output("\n".join(pick or wanted), raw)
 
 
 def _format_version_output(text: str, raw: bool) -> str:
@@ -501,22 +797,66 @@ def op_file(
     if ifthere:
         opts.append(")ifthere")
     opt_str = " " + " ".join(opts) if opts else ""
-    # Quote the path so Windows backslashes/spaces are safe in FriCAS
-    return session.request(f')read "{str(p)}"{opt_str}', timeout=timeout, raw=raw)
+    # Quote the path so Windows backslashes/spaces are safe in FriCAS. Use an
+    # absolute path, since a `fricas server` may run in another directory.
+    return session.request(
+        f')read "{str(p.absolute())}"{opt_str}', timeout=timeout, raw=raw
+    )
+
+
+# cmd.exe built-ins and shell syntax that only work through `cmd /c`
+CMD_BUILTINS = frozenset(
+    (
+        "assoc break call cd chdir cls color copy date del dir echo endlocal "
+        "erase for ftype goto if md mkdir mklink move path pause popd prompt "
+        "pushd rd rem ren rename rmdir set setlocal shift start time title type "
+        "ver verify vol"
+    ).split()
+)
+CMD_SHELL_CHARS = frozenset("|&<>^%")
+CMD_WORD_SPLIT_RE = re.compile(r"[\s/]")  # "dir/w" names the built-in "dir"
 
 
-def op_system(session: FriCASSession, cmd: str, timeout: float, raw: bool) -> str:
+def _needs_cmd_shell(cmd: str) -> bool:
+    """True if a Windows command line needs cmd.exe (built-in or shell syntax)."""
+    if CMD_SHELL_CHARS.intersection(cmd):
+        return True
+    first = CMD_WORD_SPLIT_RE.split(cmd.strip(), maxsplit=1)[0]
+    return first.lower() in CMD_BUILTINS
+
+
+def op_system(
+    session: FriCASSession, cmd: str, timeout: float, raw: bool, shell: bool = False
+) -> str:
     """
     On Windows, FriCAS `)system` does not relay child process stdout/stderr back
     to the REPL stream (you only get an exit status). To provide a useful CLI,
     we execute the system command in Python and return its captured output.
+    cmd.exe is used only when needed (or forced with `shell=True`).
 
     On non-Windows, we defer to FriCAS `)system` so behavior matches the REPL.
     """
     if os.name == "nt":
         try:
-            # Use shell=True to support built-ins like "dir"
-            proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            # Only go through cmd.exe for built-ins like "dir" or shell syntax;
+            # otherwise CreateProcess parses the command line itself
+            shell = shell or _needs_cmd_shell(cmd)
+            # Text mode for universal newlines; "replace" so odd bytes from a
+            # tool do not abort the whole command
+            opts = dict(
+                capture_output=True,
+                text=True,
+                encoding=locale.getpreferredencoding(False),
+                errors="replace",
+            )
+            try:
+                proc = subprocess.run(cmd, shell=shell, **opts)
+            except FileNotFoundError:
+                if shell:
+                    raise
+                # Not an executable on PATH (e.g. a .bat, or a built-in we
+                # do not know about); let cmd.exe resolve it
+                proc = subprocess.run(cmd, shell=True, **opts)
             out = proc.stdout or ""
             err = proc.stderr or ""
             text = out + (("\n" + err) if err and out else err)
@@ -529,14 +869,45 @@ def op_system(session: FriCASSession, cmd: str, timeout: float, raw: bool) -> st
         return session.request(f")system {cmd}", timeout=timeout, raw=raw)
 
 
-def op_pipe(session: FriCASSession, timeout: float, raw: bool) -> str:
+# System commands that only mean something inside a `)read` file; at the
+# top level `)fin` leaves FriCAS and the conditionals are not processed
+READ_DIRECTIVE_RE = re.compile(r"\)(?:fin|if|elseif|else|endif|include)\b", re.I)
+
+
+def _direct_pipe_lines(data: str) -> Optional[List[str]]:
     """
-    Read stdin fully and feed to FriCAS via a temp .input file,
-    which is the most reliable way to execute a batch.
+    Split piped input into lines that can be fed straight to the REPL.
+    Returns None when the input is large or needs `)read` semantics
+    (indented blocks, `_` line continuations, `)read`-only directives).
     """
-    data = sys.stdin.read()
+    if len(data) >= PIPE_DIRECT_MAX_BYTES:
+        return None
+    lines = []
+    for ln in data.splitlines():
+        ln = ln.rstrip()
+        if not ln.strip() or ln.lstrip().startswith(("--", "++")):
+            continue
+        if ln[0].isspace() or ln.endswith("_") or READ_DIRECTIVE_RE.match(ln):
+            return None
+        lines.append(ln)
+    return lines
+
+
+def op_pipe(
+    session: FriCASSession, timeout: float, raw: bool, data: Optional[str] = None
+) -> str:
+    """
+    Feed `data` (default: all of stdin) to FriCAS. Small inputs are written
+    to the REPL directly; anything else goes via a temp .input file, which is
+    the most reliable way to execute a large or block-structured batch.
+    """
+    if data is None:
+        data = sys.stdin.read()
     if not data.strip():
         return ""
+    lines = _direct_pipe_lines(data)
+    if lines is not None:
+        return session.request_many(lines, timeout=timeout, raw=raw)
     with tempfile.NamedTemporaryFile(
         "w", suffix=".input", delete=False, encoding="utf-8", newline="\n"
     ) as tf:
@@ -568,10 +939,13 @@ def interactive_repl(
 
     try:
         while True:
-            try:
-                line = input(colored_prompt)
-            except EOFError:
+            # Plain stdout/stdin I/O instead of input(); no per-call hook setup
+            sys.stdout.write(colored_prompt)
+            sys.stdout.flush()
+            line = sys.stdin.readline()
+            if not line:
                 break
+            line = line.rstrip("\r\n")
             if not line.strip():
                 continue
 
@@ -579,41 +953,307 @@ def interactive_repl(
             if not raw:
                 print(format_secondary(f"→ {line}"))
 
-            out = session.request(line, timeout=timeout, raw=raw)
-            if out:
-                # Format output based on content
-                formatted_out = _format_fricas_output(out, raw)
-                print(formatted_out)
-
+            # FriCAS exits on these without another prompt; stop() quits it
             if line.strip().lower() in {")quit", ")pquit", ")fin", ")exit"}:
                 break
+
+            # Print results as they arrive rather than when the command ends
+            for out in session.request_iter(line, timeout=timeout, raw=raw):
+                # Format output based on content
+                formatted_out = _format_fricas_output(out, raw)
+                print(formatted_out, flush=True)
     except KeyboardInterrupt:
         print(f"\n{format_info('Session interrupted')}")
     return 0
 
 
+# Result lines like "(1) ..." (group 1) or type information (group 2)
+LINE_CLASSIFY_RE = re.compile(r"\s*(?:(\(\d+\))|(Type:))")
+
+
+def _format_fricas_line(line: str) -> str:
+    m = LINE_CLASSIFY_RE.match(line)
+    if m:
+        color = Colors.BRIGHT_GREEN if m.group(1) else Colors.BRIGHT_BLUE
+        return _paint(line, color)
+    # Cheap shared-suffix test first; most lines contain neither word
+    if "rror" in line and ("Error" in line or "error" in line):
+        return _paint(line, Colors.BRIGHT_RED)
+    if "arning" in line and ("Warning" in line or "warning" in line):
+        return _paint(line, Colors.BRIGHT_YELLOW)
+    return line
+
+
 def _format_fricas_output(output: str, raw: bool) -> str:
     """Format FriCAS output with appropriate colors"""
-    if raw or not output.strip():
+    if raw or not output.strip() or not _should_use_colors():
         return output
+    return "\n".join([_format_fricas_line(ln) for ln in output.splitlines()])
 
-    lines = output.splitlines()
-    formatted_lines = []
 
-    for line in lines:
-        # Color mathematical expressions and results
-        if re.match(r"^\s*\(\d+\)", line):  # FriCAS result lines like (1)
-            formatted_lines.append(colorize(line, Colors.BRIGHT_GREEN))
-        elif re.match(r"^\s*Type:", line):  # Type information
-            formatted_lines.append(colorize(line, Colors.BRIGHT_BLUE))
-        elif "Error" in line or "error" in line:  # Error messages
-            formatted_lines.append(colorize(line, Colors.BRIGHT_RED))
-        elif "Warning" in line or "warning" in line:  # Warnings
-            formatted_lines.append(colorize(line, Colors.BRIGHT_YELLOW))
-        else:
-            formatted_lines.append(line)
+# -------------------------
+# Server mode
+# -------------------------
 
-    return "\n".join(formatted_lines)
+# Session calls a `fricas server` will answer for RemoteSession clients
+SERVER_CALLS = frozenset({"banner_text", "request", "request_many"})
+SERVER_CONNECT_TIMEOUT = 2.0  # then fall back to a private session
+_REMOTE_ERRORS = {
+    "TimeoutError": TimeoutError,
+    "FileNotFoundError": FileNotFoundError,
+    "FriCASExitedError": FriCASExitedError,
+}
+
+
+def _check_private(st: os.stat_result, path: Path) -> None:
+    """Refuse server files another user owns or could read or change."""
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:  # type: ignore[attr-defined]
+        raise PermissionError(f"Refusing to use {path}: not private to this user")
+
+
+def _server_dir() -> Path:
+    """
+    Per-user directory for the server's state file and socket.
+    On Windows the temp directory already is per-user.
+    """
+    if os.name == "nt":
+        return Path(tempfile.gettempdir())
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return Path(runtime) / "fricas-pro-cli"
+    return Path(tempfile.gettempdir()) / f"fricas-pro-cli-{os.getuid()}"
+
+
+def _check_server_dir(path: Path) -> None:
+    """
+    Raise unless `path` is a directory private to this user
+    (FileNotFoundError if it does not exist).
+    """
+    if os.name == "nt":
+        return
+    # lstat, so a symlink planted in a shared temp directory is rejected too
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise PermissionError(f"Refusing to use {path}: not a directory")
+    _check_private(st, path)
+
+
+def _make_server_dir() -> Path:
+    """Create (if needed) and check the server directory; only `serve` does."""
+    path = _server_dir()
+    if os.name != "nt":
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    _check_server_dir(path)
+    return path
+
+
+def _server_state_path() -> Path:
+    """Per-user file where a running server publishes its address and key."""
+    if os.name == "nt":
+        return _server_dir() / f"fricas-pro-cli-{getpass.getuser()}.server"
+    return _server_dir() / "server.json"
+
+
+def _default_server_address() -> str:
+    if os.name == "nt":
+        return rf"\\.\pipe\fricas-pro-cli-{getpass.getuser()}"
+    return str(_server_dir() / "server.sock")
+
+
+def _read_server_state() -> dict:
+    # Look only; a client must not create the directory
+    _check_server_dir(_server_dir())
+    path = _server_state_path()
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    with os.fdopen(fd, encoding="utf-8") as f:
+        if os.name != "nt":
+            _check_private(os.fstat(fd), path)
+        return json.load(f)
+
+
+def _write_server_state(state: dict) -> Path:
+    path = _server_state_path()
+    try:
+        path.unlink()  # left by a server that did not exit cleanly
+    except FileNotFoundError:
+        pass
+    # O_EXCL: never write the key into a file someone else created
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0)
+    with os.fdopen(os.open(path, flags, 0o600), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    return path
+
+
+def _send_json(conn: Connection, obj) -> None:
+    # JSON rather than Connection.send(), which would unpickle on the far end
+    conn.send_bytes(json.dumps(obj).encode("utf-8"))
+
+
+def _recv_json(conn: Connection):
+    return json.loads(conn.recv_bytes())
+
+
+class RemoteSession:
+    """
+    Stand-in for FriCASSession that forwards requests to a running
+    `fricas server`, so the high-level operations run unchanged against its
+    already-started FriCAS process.
+    """
+
+    def __init__(self, conn: Connection, address: str):
+        self._conn = conn
+        self.address = address
+        self.banner_text: str = self._call("banner_text")
+
+    def _call(self, name: str, *args, **kwargs):
+        # The caller's directory goes along, so relative paths in `)read`,
+        # `)system` and friends resolve where the user ran `fricas`
+        _send_json(self._conn, [name, args, kwargs, os.getcwd()])
+        status, value = _recv_json(self._conn)
+        if status == "ok":
+            return value
+        raise _REMOTE_ERRORS.get(status, RuntimeError)(value)
+
+    def start(self, startup_timeout: float = 20.0) -> None:
+        pass  # the server owns the FriCAS process
+
+    def request(self, line: str, timeout: float = 30.0, raw: bool = False) -> str:
+        return self._call("request", line, timeout=timeout, raw=raw)
+
+    def request_many(
+        self, lines: List[str], timeout: float = 30.0, raw: bool = False
+    ) -> str:
+        return self._call("request_many", lines, timeout=timeout, raw=raw)
+
+    def shutdown_server(self) -> None:
+        self._call("shutdown")
+
+    def stop(self, graceful_timeout: float = 5.0) -> None:
+        self._conn.close()
+
+
+def connect_server(
+    timeout: float = SERVER_CONNECT_TIMEOUT,
+) -> Optional[RemoteSession]:
+    """
+    Connect to this user's running `fricas server`, or return None if there
+    is none or it does not answer within `timeout` seconds (it serves one
+    client at a time, and Client() has no timeout of its own).
+    """
+    try:
+        state = _read_server_state()
+        address, authkey = state["address"], bytes.fromhex(state["authkey"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # no server
+
+    result: List[RemoteSession] = []
+
+    def connect() -> None:
+        try:
+            conn = Client(address, authkey=authkey)
+            result.append(RemoteSession(conn, address))
+        except (OSError, EOFError, ValueError, AuthenticationError):
+            pass  # stale state file left by a server that died
+
+    # A daemon thread, so a handshake stuck behind a busy server cannot keep
+    # this process alive once it falls back to a private session
+    t = threading.Thread(target=connect, daemon=True)
+    t.start()
+    t.join(timeout)
+    return result[0] if result else None
+
+
+def _serve_connection(session: FriCASSession, conn: Connection) -> bool:
+    """
+    Answer calls from one client until it disconnects.
+    Returns True if the client asked the server to shut down.
+    """
+    while True:
+        try:
+            msg = _recv_json(conn)
+        except (EOFError, OSError):
+            return False
+        try:
+            name, args, kwargs, cwd = msg
+            if name == "shutdown":
+                try:
+                    _send_json(conn, ["ok", None])
+                except OSError:
+                    pass
+                return True
+            if name not in SERVER_CALLS:
+                raise RuntimeError(f"Unsupported server call: {name}")
+            if name == "banner_text":
+                reply = ("ok", session.banner_text)
+            else:
+                # Cheap next to a request, and also right after a restart.
+                # Quoted like op_file's )read, for paths with spaces.
+                reply_cd = session.request(
+                    f')cd "{cwd}"', timeout=kwargs.get("timeout", 30.0)
+                )
+                if session.debug:
+                    _debug(f")cd {cwd!r}: {reply_cd}", True)
+                reply = ("ok", getattr(session, name)(*args, **kwargs))
+        except (TimeoutError, FriCASExitedError) as e:
+            # FriCAS may still be printing for the timed-out command, or it
+            # has exited; restart it so the next request begins at a clean
+            # prompt
+            session.stop()
+            reply = (type(e).__name__, str(e))
+        except Exception as e:
+            reply = (type(e).__name__, str(e))
+        try:
+            _send_json(conn, reply)
+        except OSError:
+            # The client went away mid-request (Ctrl+C, its own timeout);
+            # drop it and keep serving others
+            return False
+
+
+def serve(session: FriCASSession, address: Optional[str] = None) -> int:
+    """
+    Hold `session` open and answer requests from other `fricas` invocations
+    (one client at a time) until Ctrl+C or `fricas server --stop`.
+    """
+    _make_server_dir()
+    address = address or _default_server_address()
+    if os.name != "nt":
+        # Clients may run from any directory; publish an absolute path
+        address = os.path.abspath(address)
+        try:
+            if stat.S_ISSOCK(os.lstat(address).st_mode):
+                os.unlink(address)  # stale, from a server that did not exit cleanly
+        except FileNotFoundError:
+            pass
+    authkey = os.urandom(32)
+    listener = Listener(address, authkey=authkey)
+    state_path = None
+    try:
+        state_path = _write_server_state({"address": address, "authkey": authkey.hex()})
+        print(format_success(f"FriCAS server listening on {address}"), file=sys.stderr)
+        print(format_secondary("Press Ctrl+C to stop"), file=sys.stderr)
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            with conn:
+                if _serve_connection(session, conn):
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        if state_path is not None:
+            try:
+                state_path.unlink()
+            except OSError:
+                pass
+    print(format_info("FriCAS server stopped"), file=sys.stderr)
+    return 0
 
 
 # -------------------------
@@ -654,6 +1294,11 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Disable colored output (same as setting NO_COLOR env var).",
     )
+    p.add_argument(
+        "--no-server",
+        action="store_true",
+        help="Always start a private FriCAS session, even if `fricas server` is running.",
+    )
 
     sub = p.add_subparsers(dest="cmd", metavar="subcommand")
 
@@ -707,32 +1352,91 @@ def build_parser() -> argparse.ArgumentParser:
     # system <command>
     sp = sub.add_parser("system", help="Run a system command via ')system'.")
     sp.add_argument("command")
+    sp.add_argument(
+        "--shell",
+        action="store_true",
+        help="Windows: always run the command through cmd.exe.",
+    )
 
     # repl
     sub.add_parser("repl", help="Simple interactive shell that proxies to FriCAS.")
 
-    # pipe (read stdin to a temp .input and execute)
-    sub.add_parser(
-        "pipe", help="Read FriCAS commands from STDIN and execute (via temp .input)."
+    # pipe (feed stdin to the REPL, or via a temp .input for large batches)
+    sub.add_parser("pipe", help="Read FriCAS commands from STDIN and execute.")
+
+    # server [--socket ADDRESS] [--stop]
+    sv = sub.add_parser(
+        "server",
+        help="Keep one FriCAS session running for other invocations to reuse.",
+    )
+    sv.add_argument(
+        "--socket",
+        metavar="ADDRESS",
+        help="Named pipe (Windows) or UNIX socket path to listen on.",
+    )
+    sv.add_argument(
+        "--stop", action="store_true", help="Stop the running server and exit."
     )
 
     return p
 
 
 def main(argv=None) -> int:
-    args = build_parser().parse_args(argv)
+    parser = build_parser()
+    args = parser.parse_args(argv)
 
     # Handle color settings
     if getattr(args, "no_color", False):
         os.environ["NO_COLOR"] = "1"
+        _should_use_colors.cache_clear()
 
     if getattr(args, "verbose", False):
         args.debug = True
         args.raw = True
 
+    # No subcommand only prints help, and `system` on Windows runs in Python;
+    # neither should pay for (or require) a FriCAS start-up
+    needs_session = bool(args.cmd) and not (args.cmd == "system" and os.name == "nt")
+
+    if args.cmd == "server":
+        # A busy server may take a while to get to us; do not mistake it
+        # for a missing one
+        remote = connect_server(timeout=args.timeout)
+        if args.stop:
+            if remote is None:
+                print(format_warning("No FriCAS server is running"), file=sys.stderr)
+                return 1
+            remote.shutdown_server()
+            remote.stop()
+            print(format_success(f"Stopped FriCAS server at {remote.address}"))
+            return 0
+        if remote is not None:
+            remote.stop()
+            msg = f"A FriCAS server is already running at {remote.address}"
+            print(format_error(msg), file=sys.stderr)
+            return 1
+
+    # Read piped input before looking for a server: the server answers one
+    # client at a time, so it must not be held while stdin is still open
+    pipe_data = None
+    if args.cmd == "pipe":
+        if not args.raw:
+            print(format_secondary("Reading from stdin..."))
+        try:
+            pipe_data = sys.stdin.read()
+        except KeyboardInterrupt:
+            print(f"\n{format_info('Operation cancelled')}", file=sys.stderr)
+            return 130
+
+    # Reuse a running `fricas server` when there is one; the REPL keeps its own
+    # session, and `server` itself must not connect to another server
+    remote = None
+    if needs_session and args.cmd not in ("repl", "server") and not args.no_server:
+        remote = connect_server(timeout=min(args.timeout, SERVER_CONNECT_TIMEOUT))
+
     exe = args.fricas_path
 
-    if not Path(exe).exists():
+    if needs_session and remote is None and not Path(exe).exists():
         print(format_error(f"FriCAS executable not found: {exe}"), file=sys.stderr)
         print(
             format_info("Set FRICAS_EXE environment variable or use --fricas-path"),
@@ -740,16 +1444,22 @@ def main(argv=None) -> int:
         )
         return 2
 
-    session = FriCASSession(exe_path=exe, debug=args.debug)
+    session = remote or FriCASSession(exe_path=exe, debug=args.debug)
 
     try:
-        # Show startup message
-        if not args.raw and hasattr(args, "cmd") and args.cmd:
-            startup_msg = format_secondary(f"Starting FriCAS session...")
-            print(startup_msg, file=sys.stderr)
+        if remote is not None:
+            _debug(f"Using FriCAS server at {remote.address}", args.debug)
+        elif needs_session:
+            # Show startup message
+            if not args.raw:
+                startup_msg = format_secondary(f"Starting FriCAS session...")
+                print(startup_msg, file=sys.stderr)
 
-        # Ensure FriCAS is up and prompt ready
-        session.start()
+            # Ensure FriCAS is up and prompt ready
+            session.start()
+
+        if args.cmd == "server":
+            return serve(session, address=args.socket)
 
         if args.cmd == "version":
             out = op_version(session, timeout=args.timeout, raw=args.raw)
@@ -818,7 +1528,13 @@ def main(argv=None) -> int:
                 cmd_text = format_command(args.command)
                 print(format_secondary(f"Executing system command: {cmd_text}"))
 
-            out = op_system(session, args.command, timeout=args.timeout, raw=args.raw)
+            out = op_system(
+                session,
+                args.command,
+                timeout=args.timeout,
+                raw=args.raw,
+                shell=args.shell,
+            )
             if out:
                 print(out)
             return 0
@@ -829,16 +1545,14 @@ def main(argv=None) -> int:
             )
 
         if args.cmd == "pipe":
-            if not args.raw:
-                print(format_secondary("Reading from stdin..."))
-            out = op_pipe(session, timeout=args.timeout, raw=args.raw)
+            out = op_pipe(session, timeout=args.timeout, raw=args.raw, data=pipe_data)
             if out:
                 formatted_out = _format_fricas_output(out, args.raw)
                 print(formatted_out)
             return 0
 
         # No subcommand: show help
-        build_parser().print_help()
+        parser.print_help()
         return 0
 
     except FileNotFoundError as e: